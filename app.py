@@ -1,22 +1,31 @@
-from datetime import datetime, timedelta
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
 from collections import defaultdict
+from operator import mul
 
 class Person:
+    __slots__ = ('name', 'surname', 'payments', '_total')
+    
     def __init__(self, name, surname):
         self.name = name
         self.surname = surname
         self.payments = []
+        self._total = 0  # Running sum of payment amounts, starting like sum()
     
     def add_payment(self, amount, date):
         self.payments.append((amount, date))
+        self._total += amount
     
     def total_paid(self):
-        return sum(amount for amount, _ in self.payments)
+        return self._total
     
     def __repr__(self):
         return f"{self.name} {self.surname}"
 
 class Room:
+    __slots__ = ('name', 'area', 'occupants')
+    
     def __init__(self, name, area):
         self.name = name
         self.area = area
@@ -29,22 +38,62 @@ class PeriodError(ValueError):
     pass
 
 class CostPeriod:
-    def __init__(self, start_date: datetime, end_date: datetime, cost: float):
+    # Read-only once built, since Utility copies the fields into its columns
+    __slots__ = ('_start', '_end', '_cost', '_cost_per_day',
+                 '_start_ord', '_end_ord', '_duration')
+    
+    def __init__(self, start_date: date, end_date: date, cost: float):
         if start_date >= end_date:
             raise ValueError("Start date must be before end date")
-        self.start = start_date
-        self.end = end_date
-        self.cost = cost
+        # Only the calendar day matters, so keep day ordinals for arithmetic
+        self._start_ord = start_date.toordinal()
+        self._end_ord = end_date.toordinal()
+        self._duration = self._end_ord - self._start_ord + 1  # Inclusive
+        self._start = date.fromordinal(self._start_ord)
+        self._end = date.fromordinal(self._end_ord)
+        self._cost = cost
+        self._cost_per_day = cost / self._duration
+    
+    @property
+    def start(self):
+        return self._start
+    
+    @property
+    def end(self):
+        return self._end
+    
+    @property
+    def cost(self):
+        return self._cost
+    
+    @property
+    def cost_per_day(self):
+        return self._cost_per_day
     
     @property
     def duration_days(self):
-        return (self.end - self.start).days + 1  # Inclusive
+        return self._duration
     
     def __repr__(self):
-        return f"{self.start.strftime('%Y-%m-%d')} to {self.end.strftime('%Y-%m-%d')}: €{self.cost}"
+        return f"{self.start.isoformat()} to {self.end.isoformat()}: €{self.cost}"
+
+def _aggregate_slice(starts, ends, costs, durations, s, e):
+    """Total pro-rata cost of periods clipped to [s, e], on day ordinals"""
+    # Periods are sorted and disjoint, so ends are sorted too and the
+    # periods touching [s, e] form one contiguous run
+    lo = bisect_left(ends, s)
+    hi = bisect_right(starts, e)
+    total = 0.0
+    for i in range(lo, hi):
+        start, end = starts[i], ends[i]
+        days_active = (end if end < e else e) - (start if start > s else s) + 1
+        total += costs[i] * days_active / durations[i]
+    return total
 
 class Utility:
-    SHARING_TYPES = {'per_person', 'per_area', 'per_room'}
+    __slots__ = ('name', 'sharing_type', '_periods',
+                 '_starts', '_ends', '_costs', '_durations')
+    SHARING_TYPES = frozenset({'per_person', 'per_area', 'per_room'})
     
     def __init__(self, name: str, sharing_type: str):
         if sharing_type not in self.SHARING_TYPES:
@@ -52,40 +101,148 @@ class Utility:
         
         self.name = name
         self.sharing_type = sharing_type
-        self.periods = []
+        self._periods = []
+        self._reset_columns()
     
     def add_cost_period(self, period: CostPeriod):
-        self._validate_new_period(period)
-        self.periods.append(period)
-        self.periods.sort(key=lambda p: p.start)
+        i = self._validate_new_period(period)
+        self._insert(i, period)
+        
+        # Fold into neighbours billed at the same daily rate
+        self._merge_with_next(i)
+        if i > 0:
+            self._merge_with_next(i - 1)
+    
+    def add_cost_periods(self, periods):
+        """Add many cost periods at once, validating the combined timeline in one pass"""
+        combined = sorted([*self._periods, *periods], key=lambda p: p._start_ord)
+        for prev, curr in zip(combined, combined[1:]):
+            if curr._start_ord <= prev._end_ord:
+                raise PeriodError(f"Overlap between periods {prev} and {curr}")
+            if curr._start_ord - prev._end_ord != 1:
+                raise PeriodError(
+                    f"Gap in {self.name} between {prev.end} and {curr.start}"
+                )
+        
+        self._periods = []
+        self._reset_columns()
+        for period in combined:
+            self._insert(len(self._periods), period)
+            if len(self._periods) > 1:
+                self._merge_with_next(len(self._periods) - 2)
+    
+    def _reset_columns(self):
+        # Column-wise copies of the period fields in packed arrays, parallel
+        # to _periods and kept sorted by start, for bisect lookups and cost
+        # aggregation. Dates are stored as day ordinals, and costs as
+        # floats since they only feed the pro-rata share arithmetic
+        self._starts = array('q')
+        self._ends = array('q')
+        self._costs = array('d')
+        self._durations = array('q')
+    
+    def _insert(self, i, period):
+        self._periods.insert(i, period)
+        self._starts.insert(i, period._start_ord)
+        self._ends.insert(i, period._end_ord)
+        self._costs.insert(i, period.cost)
+        self._durations.insert(i, period._duration)
+    
+    def _merge_with_next(self, i):
+        """Merge periods i and i+1 if they are adjacent with equal cost per day"""
+        if i + 1 >= len(self._periods):
+            return
+        first, second = self._periods[i], self._periods[i+1]
+        # Compare rates by cross-multiplying, which stays exact for int and
+        # Decimal costs and does not drift as merged periods grow
+        if (self._starts[i+1] - self._ends[i] != 1 or
+                first.cost * second._duration != second.cost * first._duration):
+            return
+        
+        merged = CostPeriod(first.start, second.end, first.cost + second.cost)
+        self._periods[i:i+2] = [merged]
+        del self._starts[i+1]
+        del self._ends[i]
+        del self._costs[i+1]
+        self._costs[i] = merged.cost
+        del self._durations[i+1]
+        self._durations[i] = merged._duration
     
     def _validate_new_period(self, new_period: CostPeriod):
-        for existing in self.periods:
-            if (new_period.start <= existing.end and 
-                new_period.end >= existing.start):
-                raise PeriodError(f"Overlap with existing period {existing}")
+        """Check the new period against its neighbours and return its insertion index"""
+        if not self._periods:  # First period needs no neighbours
+            return 0
         
-        # Check for adjacent periods
-        if not any(
-            abs((new_period.start - p.end).days) == 1 or
-            abs((p.start - new_period.end).days) == 1
-            for p in self.periods
-        ):
-            if self.periods:  # Only check if not first period
+        # Periods are sorted and disjoint, so only the last period starting
+        # on or before the new one and the first starting after it can
+        # overlap or touch the new period
+        i = bisect_right(self._starts, new_period._start_ord)
+        
+        # One day gap per neighbour answers both checks: below 1 is an
+        # overlap, above 1 would leave a hole. Requiring exactly 1 on every
+        # side keeps the timeline gap-free, so coverage checks can rely on it
+        if i > 0:
+            gap = new_period._start_ord - self._ends[i-1]
+            if gap < 1:
+                raise PeriodError(f"Overlap with existing period {self._periods[i-1]}")
+            if gap > 1:
+                raise PeriodError("New period must be adjacent to existing periods")
+        if i < len(self._starts):
+            gap = self._starts[i] - new_period._end_ord
+            if gap < 1:
+                raise PeriodError(f"Overlap with existing period {self._periods[i]}")
+            if gap > 1:
                 raise PeriodError("New period must be adjacent to existing periods")
+        return i
+    
+    def cost_between(self, start_date: date, end_date: date):
+        """Pro-rata cost of all periods clipped to [start_date, end_date]"""
+        return _aggregate_slice(
+            self._starts, self._ends, self._costs, self._durations,
+            start_date.toordinal(), end_date.toordinal()
+        )
+    
+    @property
+    def periods(self):
+        """Cost periods sorted by start; add them with add_cost_period(s)"""
+        # Read-only so the list cannot drift from the columns above
+        return tuple(self._periods)
+    
+    def coverage(self):
+        """First start and last end date of the gap-free timeline, or None if empty"""
+        if not self._starts:
+            return None
+        return date.fromordinal(self._starts[0]), date.fromordinal(self._ends[-1])
     
     @property
     def total_cost(self):
-        return sum(p.cost for p in self.periods)
+        return sum(p.cost for p in self._periods)  # Keeps the caller's cost type
     
     def __repr__(self):
-        return f"{self.name} ({self.sharing_type}): {len(self.periods)} periods"
+        return f"{self.name} ({self.sharing_type}): {len(self._periods)} periods"
+
+class _Occupancy:
+    """Snapshot of the common area and each room's area and occupants"""
+    __slots__ = ('key', 'occupants', 'occupied_rooms', 'common_area', 'total_area')
+    
+    def __init__(self, rooms, common_area):
+        rooms = tuple((room.area, tuple(room.occupants)) for room in rooms)
+        self.key = (common_area, rooms)
+        self.occupants = [person for _, occupants in rooms for person in occupants]
+        # Areas come from the same snapshot as the total so fractions add up
+        self.occupied_rooms = [(area, occupants) for area, occupants in rooms if occupants]
+        self.common_area = common_area
+        self.total_area = sum(area for area, _ in rooms) + common_area
 
 class Property:
+    __slots__ = ('rooms', 'common_area', 'utilities', '_kernel', '_kernel_key')
+    
     def __init__(self):
         self.rooms = []
         self.common_area = 0
         self.utilities = []
+        self._kernel = None
+        self._kernel_key = None
     
     def add_room(self, room):
         self.rooms.append(room)
@@ -96,102 +253,131 @@ class Property:
     def add_utility(self, utility):
         self.utilities.append(utility)
     
-    def _get_occupants(self):
-        return [person for room in self.rooms for person in room.occupants]
-    
-    def calculate_shares(self, start_date: datetime, end_date: datetime):
-        shares = defaultdict(float)
-        total_days = (end_date - start_date).days + 1
-        
+    def calculate_shares(self, start_date: date, end_date: date):
         for utility in self.utilities:
             self._validate_utility_coverage(utility, start_date, end_date)
-            
-            for period in utility.periods:
-                if period.end < start_date or period.start > end_date:
-                    continue
-                
-                effective_start = max(period.start, start_date)
-                effective_end = min(period.end, end_date)
-                days_active = (effective_end - effective_start).days + 1
-                cost_per_day = period.cost / period.duration_days
-                
-                # Calculate daily cost allocation
-                daily_shares = self._calculate_daily_shares(
-                    utility.sharing_type,
-                    cost_per_day
-                )
-                
-                # Apply pro-rata for active days
-                for person, daily_share in daily_shares.items():
-                    shares[person] += daily_share * days_active
+        
+        # Rooms, areas and occupants are plain attributes that can change
+        # at any time, so snapshot them once per call
+        occupancy = _Occupancy(self.rooms, self.common_area)
+        if self._kernel is not None and self._kernel_key == self._layout_key(occupancy):
+            rows = self._kernel
+        else:
+            rows = self._coefficient_rows(occupancy)
+        
+        # Ratios are the same for every period, so apply them once to
+        # each utility's total cost over the window
+        costs = [u.cost_between(start_date, end_date) for u in self.utilities]
+        return {
+            person: sum(map(mul, row, costs), 0.0)
+            for person, row in zip(occupancy.occupants, rows)
+        }
+    
+    def compile(self):
+        """Precompute the share coefficients for the current configuration
+        
+        calculate_shares reuses them until the common area, a room's area
+        or occupants, the rooms, the utilities or their sharing types
+        change, including direct edits to those attributes.
+        """
+        occupancy = _Occupancy(self.rooms, self.common_area)
+        self._kernel = self._coefficient_rows(occupancy)
+        self._kernel_key = self._layout_key(occupancy)
+    
+    def _coefficient_rows(self, occupancy):
+        """Per occupant, the fraction of each utility's cost they pay"""
+        ratio_tables = self._build_ratio_tables(occupancy)
+        return [
+            [ratio_tables[u.sharing_type][i] for u in self.utilities]
+            for i in range(len(occupancy.occupants))
+        ]
+    
+    def _layout_key(self, occupancy):
+        return occupancy.key, tuple((u, u.sharing_type) for u in self.utilities)
+    
+    def _build_ratio_tables(self, occupancy):
+        """Occupant cost fractions, aligned with occupancy.occupants, per sharing type in use"""
+        index = {person: i for i, person in enumerate(occupancy.occupants)}
+        tables = {}
+        for sharing_type in {u.sharing_type for u in self.utilities}:
+            ratios = [0.0] * len(occupancy.occupants)
+            daily_shares = self._calculate_daily_shares(sharing_type, occupancy, 1.0)
+            for person, ratio in daily_shares.items():
+                ratios[index[person]] += ratio
+            tables[sharing_type] = ratios
+        return tables
+    
+    def _calculate_daily_shares(self, sharing_type, occupancy, daily_cost):
+        return self._SHARE_HANDLERS[sharing_type](self, occupancy, daily_cost)
     
+    def _share_per_person(self, occupancy, daily_cost):
+        shares = defaultdict(float)
+        occupants = occupancy.occupants
+        total_people = len(occupants)
+        if total_people == 0:
+            raise ValueError("No occupants for per-person calculation")
+        per_person = daily_cost / total_people
+        for person in occupants:
+            shares[person] = per_person
         return shares
     
-    def _calculate_daily_shares(self, sharing_type, daily_cost):
+    def _share_per_area(self, occupancy, daily_cost):
         shares = defaultdict(float)
-        occupants = self._get_occupants()
+        occupants = occupancy.occupants
         total_people = len(occupants)
-        total_private_area = sum(r.area for r in self.rooms)
-        total_area = total_private_area + self.common_area
-        
-        if sharing_type == 'per_person':
-            if total_people == 0:
-                raise ValueError("No occupants for per-person calculation")
-            per_person = daily_cost / total_people
-            for person in occupants:
-                shares[person] = per_person
+        total_area = occupancy.total_area
+        if total_area == 0:
+            raise ValueError("Zero area for per-area calculation")
         
-        elif sharing_type == 'per_area':
-            if total_area == 0:
-                raise ValueError("Zero area for per-area calculation")
-            
-            # Private areas
-            for room in self.rooms:
-                if room.occupants:
-                    room_share = (room.area / total_area) * daily_cost
-                    per_person = room_share / len(room.occupants)
-                    for person in room.occupants:
-                        shares[person] += per_person
-            
-            # Common area
-            if self.common_area > 0:
-                common_share = (self.common_area / total_area) * daily_cost
-                per_person_common = common_share / total_people
-                for person in occupants:
-                    shares[person] += per_person_common
+        # Private areas
+        for area, room_occupants in occupancy.occupied_rooms:
+            room_share = (area / total_area) * daily_cost
+            per_person = room_share / len(room_occupants)
+            for person in room_occupants:
+                shares[person] += per_person
         
-        elif sharing_type == 'per_room':
-            occupied_rooms = [r for r in self.rooms if r.occupants]
-            if not occupied_rooms:
-                raise ValueError("No occupied rooms for per-room calculation")
-            
-            per_room = daily_cost / len(occupied_rooms)
-            for room in occupied_rooms:
-                per_person = per_room / len(room.occupants)
-                for person in room.occupants:
-                    shares[person] += per_person
+        # Common area
+        if occupancy.common_area > 0:
+            common_share = (occupancy.common_area / total_area) * daily_cost
+            per_person_common = common_share / total_people
+            for person in occupants:
+                shares[person] += per_person_common
+        return shares
+    
+    def _share_per_room(self, occupancy, daily_cost):
+        shares = defaultdict(float)
+        occupied_rooms = occupancy.occupied_rooms
+        if not occupied_rooms:
+            raise ValueError("No occupied rooms for per-room calculation")
         
+        per_room = daily_cost / len(occupied_rooms)
+        for _, room_occupants in occupied_rooms:
+            per_person = per_room / len(room_occupants)
+            for person in room_occupants:
+                shares[person] += per_person
         return shares
     
+    # Keys mirror Utility.SHARING_TYPES
+    _SHARE_HANDLERS = {
+        'per_person': _share_per_person,
+        'per_area': _share_per_area,
+        'per_room': _share_per_room,
+    }
+    
     def _validate_utility_coverage(self, utility, start_date, end_date):
         """Ensure the utility has continuous coverage for the period"""
-        coverage_start = min(p.start for p in utility.periods)
-        coverage_end = max(p.end for p in utility.periods)
+        coverage = utility.coverage()
+        if coverage is None:
+            raise PeriodError(f"{utility.name} has no cost periods")
         
-        if coverage_start > start_date:
+        # Utility only accepts periods that keep its timeline sorted and
+        # gap-free, so the outer bounds are all that needs checking
+        coverage_start, coverage_end = coverage
+        # Compare ordinals so datetime bounds work against the stored dates
+        if coverage_start.toordinal() > start_date.toordinal():
             raise PeriodError(f"{utility.name} starts after calculation period")
-        if coverage_end < end_date:
+        if coverage_end.toordinal() < end_date.toordinal():
             raise PeriodError(f"{utility.name} ends before calculation period")
-        
-        # Check adjacent periods
-        sorted_periods = sorted(utility.periods, key=lambda p: p.start)
-        for i in range(1, len(sorted_periods)):
-            prev_end = sorted_periods[i-1].end
-            curr_start = sorted_periods[i].start
-            if (curr_start - prev_end).days != 1:
-                raise PeriodError(
-                    f"Gap in {utility.name} between {prev_end} and {curr_start}"
-                )
 
 
 # Example usage
@@ -213,23 +399,33 @@ if __name__ == "__main__":
     # Create utility with multiple cost periods
     electricity = Utility("Electricity", "per_area")
     electricity.add_cost_period(CostPeriod(
-        start_date=datetime(2024, 1, 1),
-        end_date=datetime(2024, 8, 31),
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 8, 31),
         cost=500.00
     ))
     electricity.add_cost_period(CostPeriod(
-        start_date=datetime(2024, 9, 1),
-        end_date=datetime(2024, 12, 31),
+        start_date=date(2024, 9, 1),
+        end_date=date(2024, 12, 31),
         cost=100.00
     ))
     house.add_utility(electricity)
     
     # Calculate shares for the full year
     shares = house.calculate_shares(
-        start_date=datetime(2024, 1, 1),
-        end_date=datetime(2024, 11, 30)
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 11, 30)
     )
     
     print("Annual Utility Shares:")
     for person, amount in shares.items():
-        print(f"{person}: €{amount:.2f}")
\ No newline at end of file
+        print(f"{person}: €{amount:.2f}")
+    
+    # Compiled coefficients must give the same shares, and must stop
+    # being used once the configuration changes
+    house.compile()
+    assert house.calculate_shares(date(2024, 1, 1), date(2024, 11, 30)) == shares
+    room2.area = 30
+    edited = house.calculate_shares(date(2024, 1, 1), date(2024, 11, 30))
+    assert edited != shares
+    house.compile()
+    assert house.calculate_shares(date(2024, 1, 1), date(2024, 11, 30)) == edited